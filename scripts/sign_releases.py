@@ -1,120 +1,577 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import gnupg
 import getpass
+import hashlib
+import shutil
+import tempfile
 import json
 import argparse
+import contextlib
+import functools
 import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Constants
 GITHUB_API_URL = "https://api.github.com"
-RELEASES_PER_PAGE = 30 # Max allowed by GitHub API for releases, check looks for 30 most recent
-SIGNATURE_EXTENSIONS = [".minisig", ".asc", ".sig", ".sign", ".sigstore", ".intoto.jsonl"]
+RELEASES_PER_PAGE = 100 # Max page size allowed by the GitHub API for releases
+SIGNATURE_EXTENSIONS = (".minisig", ".asc", ".sig", ".sign", ".sigstore", ".intoto.jsonl") # Tuple so str.endswith can take it directly
+GITHUB_API_VERSION = "2022-11-28"
+DOWNLOAD_CHUNK_SIZE = 1 << 20 # 1 MiB
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sprout_sign")
+RELEASES_CACHE_FILE = os.path.join(CACHE_DIR, "releases.json")
+ASSET_CACHE_DIR = os.path.join(CACHE_DIR, "assets")
+SIGNATURE_CACHE_DIR = os.path.join(CACHE_DIR, "sigs")
+
+def create_session(token, pool_size):
+    """Creates a requests session with pooled keep-alive connections and retries for GitHub."""
+    retry = Retry(total=3, backoff_factor=2, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": GITHUB_API_VERSION,
+    })
+    return session
+
+def load_releases_cache():
+    """Loads cached release listings keyed by request URL."""
+    try:
+        with open(RELEASES_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-def get_github_releases(repo_owner, repo_name, token, num_releases_to_check):
-    """Fetches the specified number of releases from GitHub."""
+def save_releases_cache(cache):
+    """Persists cached release listings, replacing the previous cache file atomically."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{RELEASES_CACHE_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, RELEASES_CACHE_FILE)
+    except OSError as e:
+        logging.warning("Could not write releases cache %s: %s", RELEASES_CACHE_FILE, e)
+
+def get_json_conditional(session, url, cache):
+    """GETs a JSON resource, revalidating any cached copy with ETag/Last-Modified.
+
+    Returns the decoded body and the response's parsed Link header. A 304
+    Not Modified response does not count against the GitHub rate limit, so
+    unchanged listings are served from the cache at no cost.
+    """
+    headers = {}
+    entry = cache.get(url)
+    if entry:
+        if entry.get('etag'):
+            headers["If-None-Match"] = entry['etag']
+        elif entry.get('last_modified'):
+            headers["If-Modified-Since"] = entry['last_modified']
+
+    response = session.get(url, headers=headers)
+    if response.status_code == 304 and entry:
+        logging.info("Using cached response for %s (not modified)", url)
+        return entry['body'], entry.get('links', {})
+    response.raise_for_status()
+    body = response.json()
+    if response.headers.get('ETag') or response.headers.get('Last-Modified'):
+        cache[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'links': response.links,
+            'body': body,
+        }
+    return body, response.links
+
+def get_github_releases(session, repo_owner, repo_name, num_releases_to_check):
+    """Fetches the specified number of releases from GitHub.
+
+    The REST listing embeds each release's assets, so no further metadata
+    requests are needed. It is used rather than GraphQL because GET requests
+    can be revalidated with ETags, and GraphQL assets lack the REST asset URL
+    needed to download from private repositories.
+    """
     releases = []
-    page = 1
-    while len(releases) < num_releases_to_check:
-        url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/releases?per_page={RELEASES_PER_PAGE}&page={page}"
-        headers = {"Authorization": f"token {token}"}
+    cache = load_releases_cache()
+    per_page = min(num_releases_to_check, RELEASES_PER_PAGE)
+    url = f"{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/releases?per_page={per_page}"
+    # Pages are fetched one after another. main() caps the count well below
+    # RELEASES_PER_PAGE, so in practice this is a single request.
+    while url and len(releases) < num_releases_to_check:
         try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            current_page_releases = response.json()
-            if not current_page_releases:
-                break # No more releases
-            releases.extend(current_page_releases)
-            if len(current_page_releases) < RELEASES_PER_PAGE:
-                break # Last page
-            page += 1
+            current_page_releases, links = get_json_conditional(session, url, cache)
         except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching releases: {e}")
+            logging.error("Error fetching releases: %s", e)
             return None
-        if len(releases) >= num_releases_to_check:
-            break
+        releases.extend(current_page_releases)
+        url = links.get('next', {}).get('url') # No next link on the last page
+    save_releases_cache(cache)
     return releases[:num_releases_to_check]
 
-def download_asset(asset_url, asset_name, token):
-    """Downloads a release asset."""
-    headers = {"Authorization": f"token {token}", "Accept": "application/octet-stream"}
+class _TeeReader:
+    """Read-only stream wrapper that copies everything read into an optional sink and hash.
+
+    python-gnupg feeds its input to gpg from a background thread and only logs
+    read errors, which would leave gpg signing truncated data. The first error
+    from `source` is kept in `error` so the caller can discard such a signature.
+
+    A failure writing to the sink only stops the copy: the sink file is closed
+    and deleted, the error is kept in `sink_error`, and reading carries on.
+    """
+
+    def __init__(self, source, sink=None, digest=None):
+        self.source = source
+        self.sink = sink
+        self.digest = digest
+        self.error = None
+        self.sink_error = None
+
+    def read(self, size=-1):
+        try:
+            data = self.source.read(size)
+        except Exception as e:
+            self.error = e
+            raise
+        if data and self.sink is not None:
+            try:
+                self.sink.write(data)
+            except OSError as e:
+                self._drop_sink(e)
+        if data and self.digest is not None:
+            self.digest.update(data)
+        return data
+
+    def _drop_sink(self, error):
+        self.sink_error = error
+        sink, self.sink = self.sink, None
+        try:
+            sink.close()
+        except OSError:
+            pass
+        with contextlib.suppress(OSError):
+            os.remove(sink.name)
+
+def cached_asset_path(asset):
+    """Returns the asset cache path, keyed by asset ID and last update time."""
+    updated_at = asset.get('updated_at', '').replace(':', '') # ':' is not valid in Windows file names
+    return os.path.join(ASSET_CACHE_DIR, f"{asset['id']}-{updated_at}")
+
+def file_sha256(filepath):
+    """Returns the hex SHA-256 digest of a file, read in DOWNLOAD_CHUNK_SIZE blocks."""
+    digest = hashlib.sha256()
+    buffer = bytearray(DOWNLOAD_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(filepath, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+def asset_sha256(asset, cache_path=None):
+    """Returns the asset's SHA-256 from GitHub's `digest` field or its cached copy, if either is available."""
+    digest = asset.get('digest') or ''
+    if digest.startswith('sha256:'):
+        return digest[len('sha256:'):]
+    if cache_path and os.path.exists(cache_path):
+        return file_sha256(cache_path)
+    return None
+
+def cached_signature_path(signing_key_id, sha256):
+    """Returns the signature cache path for content with this hash signed by this key."""
+    return os.path.join(SIGNATURE_CACHE_DIR, signing_key_id, f"{sha256}.asc")
+
+def load_cached_signature(signing_key_id, sha256):
+    """Returns the path of a usable cached signature, or None.
+
+    Entries that do not look like an armored signature (e.g. truncated by a
+    crash or a full disk) are deleted so the asset is signed again.
+    """
+    cache_path = cached_signature_path(signing_key_id, sha256)
     try:
-        logging.info(f"Downloading asset: {asset_name} from {asset_url}")
-        response = requests.get(asset_url, headers=headers, stream=True)
-        response.raise_for_status()
-        with open(asset_name, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        logging.info(f"Successfully downloaded {asset_name}")
-        return asset_name
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error downloading asset {asset_name}: {e}")
+        with open(cache_path, 'rb') as f:
+            data = f.read().strip()
+    except FileNotFoundError:
         return None
-
-def sign_file(gpg, filepath, keyid, passphrase):
-    """Signs a file using GPG and creates a detached signature."""
-    signature_file = f"{filepath}.asc"
+    except OSError as e:
+        logging.warning("Could not read cached signature %s: %s", cache_path, e)
+        return None
+    if data.startswith(b"-----BEGIN PGP SIGNATURE-----") and data.endswith(b"-----END PGP SIGNATURE-----"):
+        return cache_path
+    logging.warning("Discarding invalid cached signature %s", cache_path)
+    with contextlib.suppress(OSError):
+        os.remove(cache_path)
+    return None
+
+def store_cached_signature(signature_file, signing_key_id, sha256):
+    """Keeps a copy of a signature so identical assets in other releases can reuse it."""
+    cache_path = cached_signature_path(signing_key_id, sha256)
+    tmp_path = None
     try:
-        logging.info(f"Signing file: {filepath} with key ID {keyid}")
-        with open(filepath, 'rb') as f:
-            status = gpg.sign_file(f, keyid=keyid, detach=True, output=signature_file, passphrase=passphrase)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # A unique temp name per call; worker threads share the process ID.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        os.close(fd)
+        shutil.copyfile(signature_file, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logging.warning("Could not cache signature %s: %s", signature_file, e)
+        if tmp_path:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+
+def download_and_sign_asset(session, sign, asset_url, asset_name, signature_file, cache_path=None, digest=None):
+    """Streams a release asset straight into the signer, optionally keeping a copy at cache_path.
+
+    If `digest` is given (a hashlib object), it is updated with the downloaded bytes.
+    """
+    headers = {"Accept": "application/octet-stream"}
+    partial_path = f"{cache_path}.part" if cache_path else None
+    cache_file = None
+    try:
+        logging.info("Downloading asset: %s from %s", asset_name, asset_url)
+        with session.get(asset_url, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            if partial_path:
+                try:
+                    os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+                    cache_file = open(partial_path, 'wb')
+                except OSError as e:
+                    logging.warning("Could not cache asset %s: %s", asset_name, e)
+            reader = _TeeReader(response.raw, cache_file, digest)
+            signed_file_path = sign(reader, signature_file, source_name=asset_name)
+
+        if reader.error is not None:
+            logging.error("Error downloading asset %s: %s", asset_name, reader.error)
+            if signed_file_path and os.path.exists(signed_file_path):
+                os.remove(signed_file_path)
+            return None
+        if reader.sink_error is not None:
+            logging.warning("Could not cache asset %s: %s", asset_name, reader.sink_error)
+        elif signed_file_path and cache_file is not None:
+            try:
+                cache_file.close()
+                os.replace(partial_path, cache_path)
+            except OSError as e:
+                logging.warning("Could not cache asset %s: %s", asset_name, e)
+        return signed_file_path
+    except (requests.exceptions.RequestException, OSError) as e:
+        logging.error("Error downloading asset %s: %s", asset_name, e)
+        return None
+    finally:
+        if cache_file is not None:
+            with contextlib.suppress(OSError):
+                cache_file.close()
+        if partial_path and os.path.exists(partial_path):
+            with contextlib.suppress(OSError):
+                os.remove(partial_path)
+
+def sign_file(gpg, source, signature_file, keyid, passphrase, source_name=None, extra_args=None):
+    """Signs a file path or readable stream using GPG and creates a detached signature."""
+    # Each call spawns its own gpg process. Batching with `gpg --multifile
+    # --detach-sign` is not possible: gpg rejects --multifile for signing
+    # ("--sign does not yet work with --multifile"), and the per-process cost
+    # is small next to the download and upload of each asset.
+    filepath = source_name or source
+    try:
+        logging.info("Signing file: %s with key ID %s", filepath, keyid)
+        if isinstance(source, str):
+            # Open paths here: python-gnupg closes files it opened itself
+            # without waiting for its copy thread to finish reading them.
+            with open(source, 'rb') as f:
+                status = gpg.sign_file(
+                    f, keyid=keyid, detach=True, output=signature_file, passphrase=passphrase, extra_args=extra_args
+                )
+        else:
+            status = gpg.sign_file(
+                source, keyid=keyid, detach=True, output=signature_file, passphrase=passphrase, extra_args=extra_args
+            )
 
         # Check if the signing was successful.
         # The 'status' object from python-gnupg has a 'status' attribute (string)
         # and 'stderr'. Success is typically indicated by status.status == 'signature created'.
         if status and hasattr(status, 'status') and status.status == 'signature created':
-            logging.info(f"Successfully signed {filepath}, signature: {signature_file}")
+            logging.info("Successfully signed %s, signature: %s", filepath, signature_file)
             return signature_file
         else:
             # Log GPG's actual status and stderr for diagnostics
             gpg_status_msg = getattr(status, 'status', 'N/A (status object might be None or lack status attribute)')
             gpg_stderr_msg = getattr(status, 'stderr', 'N/A (status object might be None or lack stderr attribute)')
-            logging.error(f"Error signing file {filepath}: GPG status '{gpg_status_msg}', stderr: '{gpg_stderr_msg}'")
+            logging.error("Error signing file %s: GPG status '%s', stderr: '%s'", filepath, gpg_status_msg, gpg_stderr_msg)
             if os.path.exists(signature_file): # Clean up partial signature
                 os.remove(signature_file)
             return None
     except Exception as e:
-        logging.error(f"Exception during signing of {filepath}: {e}")
+        logging.error("Exception during signing of %s: %s", filepath, e)
+        if os.path.exists(signature_file):
+            os.remove(signature_file)
+        return None
+
+def _gpg_connect_agent(gpg_program, commands):
+    """Sends Assuan commands to gpg-agent and returns the responses, one per line."""
+    program_dir = os.path.dirname(gpg_program)
+    connect_agent = os.path.join(program_dir, "gpg-connect-agent") if program_dir else "gpg-connect-agent"
+    result = subprocess.run(
+        [connect_agent], input="".join(f"{command}\n" for command in commands) + "/bye\n",
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout.splitlines()
+
+def preset_gpg_passphrase(gpg_program, keyid, passphrase):
+    """Caches the passphrase for all of the key's (sub)keys in gpg-agent.
+
+    The passphrase is sent on stdin, never as an argument. Requires
+    `allow-preset-passphrase` in gpg-agent.conf. Returns the preset keygrips,
+    or None if the agent refused, in which case each signature passes the
+    passphrase itself.
+    """
+    try:
+        listing = subprocess.run(
+            [gpg_program, "--batch", "--with-colons", "--with-keygrip", "--list-secret-keys", keyid],
+            capture_output=True, text=True, check=True,
+        )
+        keygrips = [line.split(':')[9] for line in listing.stdout.splitlines() if line.startswith('grp:')]
+        passphrase_hex = passphrase.encode('utf-8').hex().upper()
+        responses = _gpg_connect_agent(
+            gpg_program, [f"PRESET_PASSPHRASE {keygrip} -1 {passphrase_hex}" for keygrip in keygrips]
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        logging.info("Could not preset the GPG passphrase in gpg-agent (%s); passing it with each signature instead.", e)
+        return None
+
+    errors = [response for response in responses if response.startswith('ERR')]
+    if not keygrips or errors:
+        logging.info(
+            "gpg-agent did not accept a preset passphrase (%s); passing it with each signature instead. "
+            "Add 'allow-preset-passphrase' to gpg-agent.conf to enable presetting.",
+            errors[0] if errors else 'no keygrips found',
+        )
+        if errors:
+            clear_gpg_passphrase(gpg_program, keygrips)
+        return None
+    logging.info("Preset GPG passphrase in gpg-agent for key %s.", keyid)
+    return keygrips
+
+def clear_gpg_passphrase(gpg_program, keygrips):
+    """Removes passphrases set by preset_gpg_passphrase from gpg-agent's cache."""
+    try:
+        _gpg_connect_agent(gpg_program, [f"CLEAR_PASSPHRASE --mode=normal {keygrip}" for keygrip in keygrips])
+    except (OSError, subprocess.CalledProcessError) as e:
+        logging.warning("Could not clear the preset GPG passphrase from gpg-agent: %s", e)
+
+def check_gpg_passphrase(gpg, keyid, passphrase):
+    """Returns whether the passphrase unlocks the key, by signing an empty message with loopback pinentry."""
+    status = gpg.sign("", keyid=keyid, passphrase=passphrase)
+    if getattr(status, 'status', None) == 'signature created':
+        return True
+    # python-gnupg leaves `status` unset for a bad passphrase; gpg's last message says why.
+    messages = [line for line in (getattr(status, 'stderr', '') or '').splitlines() if line.startswith('gpg: ')]
+    reason = getattr(status, 'status', None) or (messages[-1] if messages else 'unknown error')
+    logging.error("Could not sign with GPG key %s, check the passphrase: %s", keyid, reason)
+    return False
+
+@contextlib.contextmanager
+def gpg_signer(gpg, gpg_program, keyid, passphrase):
+    """Yields a sign_file callable for the key, presetting its passphrase in gpg-agent for the duration."""
+    keygrips = preset_gpg_passphrase(gpg_program, keyid, passphrase) if passphrase else None
+    try:
+        if keygrips:
+            # Never fall back to the agent's own pinentry from worker threads;
+            # fail if the cached passphrase is somehow unusable.
+            yield functools.partial(
+                sign_file, gpg, keyid=keyid, passphrase=None, extra_args=["--batch", "--pinentry-mode", "error"]
+            )
+        else:
+            # An empty passphrase must be passed as None: python-gnupg would
+            # otherwise still read a passphrase line from the signed data.
+            yield functools.partial(sign_file, gpg, keyid=keyid, passphrase=passphrase or None)
+    finally:
+        if keygrips:
+            clear_gpg_passphrase(gpg_program, keygrips)
+
+def load_pgp_key(key_path):
+    """Loads an armored secret key with PGPy and asks for its passphrase if it is protected.
+
+    Returns the key and passphrase, or (None, None) if the key cannot be used.
+    """
+    try:
+        import pgpy # Optional dependency, only needed for --pgp-key
+    except ImportError:
+        logging.error("Signing with --pgp-key requires PGPy. Install it with: pip install pgpy")
+        return None, None
+
+    try:
+        key, _ = pgpy.PGPKey.from_file(key_path)
+    except (OSError, ValueError, pgpy.errors.PGPError) as e:
+        logging.error("Could not load PGP key from %s: %s", key_path, e)
+        return None, None
+    if key.is_public:
+        logging.error("%s contains a public key; a secret key is required for signing.", key_path)
+        return None, None
+
+    passphrase = None
+    if key.is_protected:
+        passphrase = getpass.getpass(f"Enter passphrase for PGP key {key.fingerprint.keyid}: ")
+        try:
+            with key.unlock(passphrase):
+                pass
+        except pgpy.errors.PGPDecryptionError as e:
+            logging.error("Could not unlock PGP key %s: %s", key.fingerprint.keyid, e)
+            return None, None
+    return key, passphrase
+
+def sign_file_pgpy(key, source, signature_file, source_name=None):
+    """Signs a file path or readable stream in-process with PGPy and creates a detached signature.
+
+    The key must already be unlocked. Unlike gpg, this holds the whole file in
+    memory, but it needs no gpg-agent, so several assets can be signed at once.
+    """
+    filepath = source_name or source
+    try:
+        logging.info("Signing file: %s with key ID %s (PGPy)", filepath, key.fingerprint.keyid)
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                data = f.read()
+        else:
+            data = source.read()
+        signature = key.sign(data)
+        with open(signature_file, 'w', encoding='ascii') as f:
+            f.write(str(signature))
+        logging.info("Successfully signed %s, signature: %s", filepath, signature_file)
+        return signature_file
+    except Exception as e:
+        logging.error("Exception during signing of %s: %s", filepath, e)
         if os.path.exists(signature_file):
             os.remove(signature_file)
         return None
 
-def upload_asset(upload_url_template, filepath, token):
+@contextlib.contextmanager
+def pgpy_signer(key, passphrase):
+    """Yields a sign_file_pgpy callable for the key, keeping it unlocked for the duration."""
+    with key.unlock(passphrase) if key.is_protected else contextlib.nullcontext():
+        yield functools.partial(sign_file_pgpy, key)
+
+def upload_asset(session, upload_url_template, filepath):
     """Uploads an asset to a GitHub release."""
     asset_name = os.path.basename(filepath)
     # GitHub's upload_url includes path parameters like {?name,label}, remove them.
     upload_url = upload_url_template.split('{')[0] + f"?name={asset_name}"
-    headers = {
-        "Authorization": f"token {token}",
-        "Content-Type": "application/octet-stream"
-    }
     try:
-        logging.info(f"Uploading asset: {asset_name} to {upload_url}")
+        # Send an explicit length so the file is streamed as-is rather than
+        # with chunked transfer encoding, which some proxies reject.
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(os.path.getsize(filepath)),
+        }
+        logging.info("Uploading asset: %s to %s", asset_name, upload_url)
         with open(filepath, 'rb') as f:
-            response = requests.post(upload_url, headers=headers, data=f)
+            response = session.post(upload_url, headers=headers, data=f)
         response.raise_for_status()
-        logging.info(f"Successfully uploaded {asset_name}")
+        logging.info("Successfully uploaded %s", asset_name)
         return response.json()
     except requests.exceptions.RequestException as e:
-        logging.error(f"Error uploading asset {asset_name}: {e}")
-        if response:
-            logging.error(f"Response content: {response.text}")
+        logging.error("Error uploading asset %s: %s", asset_name, e)
+        if e.response is not None:
+            logging.error("Response content: %s", e.response.text)
         return None
     except Exception as e:
-        logging.error(f"An unexpected error occurred during upload of {asset_name}: {e}")
+        logging.error("An unexpected error occurred during upload of %s: %s", asset_name, e)
         return None
 
+def should_sign(asset, existing_asset_names, args):
+    """Returns whether an asset needs a signature, logging why it is skipped otherwise."""
+    asset_name = asset['name']
+
+    # Skip if it's already a signature file
+    if asset_name.endswith(SIGNATURE_EXTENSIONS):
+        logging.info("Skipping signature file: %s", asset_name)
+        return False
+
+    # Skip if --skip-already-signed and signature exists
+    signature_filename_asc = f"{asset_name}.asc"
+    if args.skip_already_signed and signature_filename_asc in existing_asset_names:
+        logging.info("Signature %s already exists for %s. Skipping.", signature_filename_asc, asset_name)
+        return False
+    return True
+
+def process_asset(session, asset, release, temp_dir, sign, signing_key_id, use_asset_cache):
+    """Signs a single release asset and uploads the detached signature.
+
+    `sign` is sign_file or sign_file_pgpy with the key arguments already bound.
+
+    Returns the upload response for the signature, or None if any step failed.
+    """
+    asset_name = asset['name']
+    asset_api_url = asset['url'] # API URL for asset details and download
+    # Asset names repeat across releases, so each release gets its own subdirectory.
+    signature_file = os.path.join(temp_dir, str(release['id']), f"{asset_name}.asc")
+    cache_path = cached_asset_path(asset) if use_asset_cache else None
+
+    signed_file_path = None
+    try:
+        # The same binary is often attached to several releases; reuse its
+        # signature instead of signing it again.
+        sha256 = asset_sha256(asset, cache_path)
+        cached_signature = load_cached_signature(signing_key_id, sha256) if sha256 else None
+        if cached_signature:
+            logging.info("Reusing cached signature for %s (sha256 %s)", asset_name, sha256)
+            shutil.copyfile(cached_signature, signature_file)
+            signed_file_path = signature_file
+        else:
+            if cache_path and os.path.exists(cache_path):
+                logging.info("Using cached copy of %s: %s", asset_name, cache_path)
+                signed_file_path = sign(cache_path, signature_file)
+            else:
+                digest = hashlib.sha256()
+                signed_file_path = download_and_sign_asset(
+                    session, sign, asset_api_url, asset_name, signature_file, cache_path, digest
+                )
+                sha256 = digest.hexdigest()
+            if not signed_file_path:
+                return None
+            store_cached_signature(signed_file_path, signing_key_id, sha256)
+
+        # Only the signature is uploaded; the original asset is left untouched.
+        logging.info("Uploading signature %s...", os.path.basename(signed_file_path))
+        return upload_asset(session, release['upload_url'], signed_file_path)
+    finally:
+        # Clean up temporary files
+        if signed_file_path and os.path.exists(signed_file_path):
+            os.remove(signed_file_path)
+
+def process_asset_group(session, assets, temp_dir, sign, signing_key_id, use_asset_cache):
+    """Processes (release, asset) pairs with identical content one after another.
+
+    The first asset's signature goes into the signature cache, so the others
+    reuse it instead of being downloaded and signed again.
+    """
+    for release, asset in assets:
+        try:
+            process_asset(session, asset, release, temp_dir, sign, signing_key_id, use_asset_cache)
+        except Exception as e:
+            logging.error("Unexpected error while processing asset %s: %s", asset['name'], e)
+
 def main():
     parser = argparse.ArgumentParser(description="Sign GitHub release artifacts and re-upload them with signatures.")
     parser.add_argument("repo", help="Repository name in 'owner/repo' format (e.g., nightconcept/almandine).")
     parser.add_argument("--github-token", help="GitHub Personal Access Token. If not provided, will try to read from GITHUB_TOKEN env var or prompt.")
     parser.add_argument("--gpg-program", default="gpg", help="Path to GPG executable (if not in PATH).")
+    parser.add_argument("--pgp-key", help="Path to an armored secret key to sign with in-process using PGPy instead of GPG.")
     parser.add_argument("--num-releases", type=int, default=5, help="Number of recent releases to process (max 30).")
     parser.add_argument("--skip-already-signed", action='store_true', help="Skip assets if a corresponding signature file already exists in the release.")
     parser.add_argument("--yes", action='store_true', help="Automatically confirm actions without prompting.")
+    parser.add_argument("--asset-cache", action='store_true', help="Keep a copy of each downloaded asset in the local cache so later runs do not download it again.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of assets to download, sign and upload concurrently.")
 
     args = parser.parse_args()
 
@@ -125,109 +582,115 @@ def main():
     if not github_token:
         github_token = getpass.getpass("Enter GitHub Personal Access Token: ")
 
-    gpg = gnupg.GPG(gpgbinary=args.gpg_program)
-
-    # Find the first available GPG secret key suitable for signing
-    secret_keys = gpg.list_keys(secret=True)
-    signing_key = None
-    for key in secret_keys:
-        for uid_details in key.get('uids', []):
-            # A simple check, might need refinement based on GPG key capabilities
-            if 'S' in key.get('cap', ''): # Check if key has signing capability
-                signing_key = key
+    if args.pgp_key:
+        pgp_key, pgp_passphrase = load_pgp_key(args.pgp_key)
+        if pgp_key is None:
+            return
+        logging.info("Using PGP Key ID: %s (%s) for signing.", pgp_key.fingerprint.keyid, args.pgp_key)
+        signing_key_id = str(pgp_key.fingerprint.keyid)
+        signer = pgpy_signer(pgp_key, pgp_passphrase)
+    else:
+        gpg = gnupg.GPG(gpgbinary=args.gpg_program)
+        gpg.buffer_size = DOWNLOAD_CHUNK_SIZE # Downloads are piped into gpg in chunks of this size
+
+        # Find the first available GPG secret key suitable for signing
+        secret_keys = gpg.list_keys(secret=True)
+        signing_key = None
+        for key in secret_keys:
+            for uid_details in key.get('uids', []):
+                # A simple check, might need refinement based on GPG key capabilities
+                if 'S' in key.get('cap', ''): # Check if key has signing capability
+                    signing_key = key
+                    break
+            if signing_key:
                 break
-        if signing_key:
-            break
-
-    if not signing_key:
-        logging.error("No suitable GPG secret key found for signing. Please ensure you have a GPG key with signing capability.")
-        logging.info("Available secret keys (if any):")
-        for skey in secret_keys:
-             logging.info(f"  KeyID: {skey['keyid']}, UIDs: {skey.get('uids', 'N/A')}, Capabilities: {skey.get('cap', 'N/A')}")
-        return
 
-    gpg_key_id = signing_key['keyid']
-    logging.info(f"Using GPG Key ID: {gpg_key_id} ({signing_key.get('uids', ['No UID'])[0]}) for signing.")
+        if not signing_key:
+            logging.error("No suitable GPG secret key found for signing. Please ensure you have a GPG key with signing capability.")
+            logging.info("Available secret keys (if any):")
+            for skey in secret_keys:
+                 logging.info("  KeyID: %s, UIDs: %s, Capabilities: %s", skey['keyid'], skey.get('uids', 'N/A'), skey.get('cap', 'N/A'))
+            return
 
-    gpg_passphrase = getpass.getpass(f"Enter GPG passphrase for key {gpg_key_id} (leave blank if none): ")
+        gpg_key_id = signing_key['keyid']
+        logging.info("Using GPG Key ID: %s (%s) for signing.", gpg_key_id, signing_key.get('uids', ['No UID'])[0])
 
-    logging.info(f"Fetching last {num_releases_to_check} releases for {repo_owner}/{repo_name}...")
-    releases = get_github_releases(repo_owner, repo_name, github_token, num_releases_to_check)
+        gpg_passphrase = getpass.getpass(f"Enter GPG passphrase for key {gpg_key_id} (leave blank if none): ")
+        if gpg_passphrase and not check_gpg_passphrase(gpg, gpg_key_id, gpg_passphrase):
+            return
+        signing_key_id = gpg_key_id
+        signer = gpg_signer(gpg, args.gpg_program, gpg_key_id, gpg_passphrase)
+
+    logging.info("Fetching last %s releases for %s/%s...", num_releases_to_check, repo_owner, repo_name)
+    session = create_session(github_token, max(1, args.workers))
+    releases = get_github_releases(session, repo_owner, repo_name, num_releases_to_check)
 
     if not releases:
         logging.info("No releases found or error fetching releases.")
         return
 
+    # Build the whole work list before any downloads so the user is asked
+    # once, and the worker threads never wait on a prompt.
+    work = []
     for release in releases:
         release_name = release.get('name', release['tag_name'])
-        logging.info(f"\nProcessing release: {release_name} (ID: {release['id']}, Tag: {release['tag_name']})")
+        logging.info("\nChecking release: %s (ID: %s, Tag: %s)", release_name, release['id'], release['tag_name'])
 
         if 'assets' not in release or not release['assets']:
-            logging.info(f"No assets found for release {release_name}.")
+            logging.info("No assets found for release %s.", release_name)
             continue
 
-        upload_url_template = release['upload_url']
         existing_asset_names = {asset['name'] for asset in release['assets']}
 
-        for asset in release['assets']:
-            asset_name = asset['name']
-            asset_url = asset['browser_download_url'] # This is the public URL, need API URL for download
-            asset_api_url = asset['url'] # API URL for asset details and download
-
-            # Skip if it's already a signature file
-            if any(asset_name.endswith(ext) for ext in SIGNATURE_EXTENSIONS):
-                logging.info(f"Skipping signature file: {asset_name}")
-                continue
-
-            # Skip if --skip-already-signed and signature exists
-            signature_filename_asc = f"{asset_name}.asc"
-            if args.skip_already_signed and signature_filename_asc in existing_asset_names:
-                logging.info(f"Signature {signature_filename_asc} already exists for {asset_name}. Skipping.")
-                continue
-
-            if not args.yes:
-                confirm = input(f"Sign and re-upload asset '{asset_name}' for release '{release_name}'? (y/N): ")
-                if confirm.lower() != 'y':
-                    logging.info(f"Skipping asset {asset_name} by user choice.")
-                    continue
-
-            downloaded_file_path = None
-            signed_file_path = None
-            temp_dir = f"temp_release_assets_{release['id']}"
-            os.makedirs(temp_dir, exist_ok=True)
+        if args.skip_already_signed and all(
+            f"{asset['name']}.asc" in existing_asset_names
+            for asset in release['assets']
+            if not asset['name'].endswith(SIGNATURE_EXTENSIONS)
+        ):
+            logging.info("All assets in release %s are already signed. Skipping.", release_name)
+            continue
 
-            original_asset_path_in_temp = os.path.join(temp_dir, asset_name)
+        work.extend(
+            (release, asset) for asset in release['assets'] if should_sign(asset, existing_asset_names, args)
+        )
 
-            try:
-                downloaded_file_path = download_asset(asset_api_url, original_asset_path_in_temp, github_token)
-                if not downloaded_file_path:
-                    continue
-
-                signed_file_path = sign_file(gpg, downloaded_file_path, gpg_key_id, gpg_passphrase)
-                if not signed_file_path:
-                    continue
-
-                # Upload original asset (if it was somehow modified or to ensure it's there)
-                # This is generally not needed if we are just adding signatures,
-                # but could be part of a "refresh" flow. For now, we assume original is fine.
-                # If the workflow is to replace, then we'd upload downloaded_file_path.
-                # For now, we only upload the signature.
-
-                # Upload signature
-                logging.info(f"Uploading signature {os.path.basename(signed_file_path)}...")
-                upload_asset(upload_url_template, signed_file_path, github_token)
-
-            finally:
-                # Clean up temporary files
-                if downloaded_file_path and os.path.exists(downloaded_file_path):
-                    os.remove(downloaded_file_path)
-                if signed_file_path and os.path.exists(signed_file_path):
-                    os.remove(signed_file_path)
-                if os.path.exists(temp_dir) and not os.listdir(temp_dir): # Remove dir if empty
-                    os.rmdir(temp_dir)
-                elif os.path.exists(temp_dir) and os.listdir(temp_dir):
-                    logging.warning(f"Temporary directory {temp_dir} is not empty after processing asset {asset_name}. Manual cleanup may be required.")
+    if not work:
+        logging.info("No assets to sign.")
+        logging.info("\nScript finished.")
+        return
 
+    if not args.yes:
+        print(f"\nThe following {len(work)} assets will be signed and have their signatures uploaded:")
+        for release, asset in work:
+            print(f"  {release.get('name', release['tag_name'])}: {asset['name']}")
+        confirm = input(f"Proceed to sign {len(work)} assets? (y/N): ")
+        if confirm.lower() != 'y':
+            logging.info("Aborted by user choice.")
+            return
+
+    with signer as sign, tempfile.TemporaryDirectory(prefix='sprout_sign_') as temp_dir:
+        for release_id in {release['id'] for release, _ in work}:
+            os.mkdir(os.path.join(temp_dir, str(release_id)))
+
+        # Group assets GitHub reports as identical (same `digest`) so that
+        # concurrent workers do not each download and sign the same binary.
+        groups = {}
+        for release, asset in work:
+            groups.setdefault(asset.get('digest') or (release['id'], asset['id']), []).append((release, asset))
+
+        logging.info("\nProcessing %d assets across %d releases...", len(work), len({release['id'] for release, _ in work}))
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {
+                executor.submit(
+                    process_asset_group, session, group, temp_dir, sign, signing_key_id, args.asset_cache
+                ): group
+                for group in groups.values()
+            }
+            completed = 0
+            for future in as_completed(futures):
+                future.result()
+                completed += len(futures[future])
+                logging.info("Progress: %d/%d assets processed.", completed, len(work))
 
     logging.info("\nScript finished.")
 